@@ -2,57 +2,89 @@ from datetime import timezone, datetime
 import asyncio
 import logging
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.params import Query
+from fastapi.responses import ORJSONResponse
 
 from src.db import create_tables
-from src.health_checker import HealthChecker
+from src.health_checker import HEALTH_HTTPX, HealthChecker
 from src.queue import payment_queue
 from src.schemas import Payment, PaymentSummary, PaymentReport
-from src.worker import Cache, PaymentProcessor, PaymentRepo
+from src.worker import PROCESSOR_CLIENTS, Cache, PaymentProcessor, PaymentRepo
 
 logging.basicConfig(level=logging.INFO)
+# httpx logs every request at INFO, which means one line per payment sent
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_tables()
+    await create_tables()
 
-    cache = Cache()
+    cache = get_cache()
     health_manager = HealthChecker(cache)
-    repo = PaymentRepo()
+    repo = get_repo()
     processor = PaymentProcessor(health_manager, repo)
 
+    await warm_connections(cache)
+    await health_manager.check_all()
+
     processing_task = asyncio.create_task(
         payment_queue.start_processing(processor)
     )
 
-    health_task = asyncio.create_task(periodic_health_check(health_manager))
+    flush_task = asyncio.create_task(processor.payment_buffer.run_forever())
+
+    health_task = asyncio.create_task(health_manager.run_forever())
+
+    stats_task = asyncio.create_task(processor.report_stats())
 
     yield
 
-    await processor.shutdown()
     processing_task.cancel()
     health_task.cancel()
+    stats_task.cancel()
+    flush_task.cancel()
+    await asyncio.gather(flush_task, return_exceptions=True)
+    await processor.shutdown()
+    for client in PROCESSOR_CLIENTS.values():
+        await client.aclose()
+    await HEALTH_HTTPX.aclose()
+    await cache.client.aclose(close_connection_pool=True)
+
+async def warm_connections(cache: Cache, per_processor: int = 10):
+    """Open keep-alive sockets to both processors and Redis before traffic arrives"""
+    # Hit the root path, not service-health, which is rate limited per caller
+    results = await asyncio.gather(
+        *(
+            client.get("/")
+            for client in PROCESSOR_CLIENTS.values()
+            for _ in range(per_processor)
+        ),
+        cache.client.ping(),
+        return_exceptions=True,
+    )
+    failures = sum(isinstance(result, Exception) for result in results)
+    if failures:
+        logger.warning(f"Connection warm-up: {failures} of {len(results)} attempts failed")
 
-async def periodic_health_check(health_manager):
-    """Periodic health check to warm cache"""
-    while True:
-        try:
-            await health_manager._check_health_async("default")
-            await health_manager._check_health_async("fallback")
-            await asyncio.sleep(5)
-        except Exception as e:
-            logging.error(f"Health check error: {e}")
-            await asyncio.sleep(5)
-
-def get_cache():
+@lru_cache(maxsize=1)
+def get_cache() -> Cache:
     return Cache()
 
 
-app = FastAPI(lifespan=lifespan)
+@lru_cache(maxsize=1)
+def get_repo() -> PaymentRepo:
+    return PaymentRepo()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
 @app.post("/payments")
 async def create_payment(payment: Payment):
@@ -61,39 +93,31 @@ async def create_payment(payment: Payment):
         await payment_queue.add_payment(payment.to_dict())
         return {"message": "Payment queued"}
     except Exception as e:
-        logging.error(f"Error queueing payment: {e}")
+        logger.error(f"Error queueing payment: {e}")
         return {"error": "Failed to queue payment"}
 
 
 @app.get("/payments-summary", response_model=PaymentReport)
-def summary(to: Optional[str] = Query(None, alias="to"), from_date: Optional[str] = Query(None, alias="from")):
-    repo = PaymentRepo()
-    payments = repo.get_all()
+async def summary(
+    to: Optional[str] = Query(None, alias="to"),
+    from_date: Optional[str] = Query(None, alias="from"),
+    repo: PaymentRepo = Depends(get_repo),
+):
     to = datetime.fromisoformat(to.replace("Z", "+00:00")) if to else datetime.now(timezone.utc)
     from_date = datetime.fromisoformat(from_date.replace("Z", "+00:00")) if from_date else datetime.min.replace(
         tzinfo=timezone.utc)
 
-    default = [payment for payment in payments if payment.processor == "default"]
-    fallback = [payment for payment in payments if payment.processor == "fallback"]
-
-    default_summary = PaymentSummary(
-        totalRequests=len(default),
-        totalAmount=sum(payment.amount for payment in default),
-    )
-
-    fallback_summary = PaymentSummary(
-        totalRequests=len(fallback),
-        totalAmount=sum(payment.amount for payment in fallback),
-    )
+    totals = await repo.summarize(from_date, to)
+    default_count, default_amount = totals.get("default", (0, 0.0))
+    fallback_count, fallback_amount = totals.get("fallback", (0, 0.0))
 
     return PaymentReport(
-        default=default_summary,
-        fallback=fallback_summary
+        default=PaymentSummary(totalRequests=default_count, totalAmount=default_amount),
+        fallback=PaymentSummary(totalRequests=fallback_count, totalAmount=fallback_amount),
     )
 
 
 @app.post("/purge-payments")
-async def purge_payments():
-    repo = PaymentRepo()
-    repo.purge()
+async def purge_payments(repo: PaymentRepo = Depends(get_repo)):
+    await repo.purge()
     return {"message": "Payments purged"}, 200
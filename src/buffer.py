@@ -1,7 +1,6 @@
 # src/payment_buffer.py
 import asyncio
 import logging
-from datetime import datetime, timezone
 from typing import List, TYPE_CHECKING
 
 from src.schemas import ProcessedPayment
@@ -9,52 +8,112 @@ from src.schemas import ProcessedPayment
 if TYPE_CHECKING:
     from src.worker import PaymentRepo
 
+logger = logging.getLogger(__name__)
+
 class PaymentBuffer:
-    def __init__(self, repo: "PaymentRepo", batch_size=200, flush_interval=5):
+    def __init__(
+        self,
+        repo: "PaymentRepo",
+        min_batch_size=20,
+        max_batch_size=500,
+        flush_interval=1.0,
+        target_latency=0.1,
+        max_pending=10000,
+    ):
         self.repo = repo
-        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        # Oldest payment in a batch never waits longer than this
         self.flush_interval = flush_interval
-        self.buffer: List[ProcessedPayment] = []
-        self.last_flush = datetime.now(timezone.utc)
-        self.lock = asyncio.Lock()
+        # Batch roughly this many seconds of ingress per insert
+        self.target_latency = target_latency
+        self.queue: asyncio.Queue[ProcessedPayment] = asyncio.Queue(maxsize=max_pending)
+        self.ingress_rate = 0.0
+        self.rate_smoothing = 0.3
+        self.arrivals = 0
+        self.rate_mark = 0.0
 
     async def add_payment(self, payment: ProcessedPayment):
-        """Add payment to buffer, flush if needed"""
-        async with self.lock:
-            self.buffer.append(payment)
-
-            # Check if we should flush
-            should_flush = (
-                    len(self.buffer) >= self.batch_size or  # Buffer full
-                    (datetime.now(timezone.utc) - self.last_flush).total_seconds() > self.flush_interval
-            )
-
-            if should_flush:
-                await self._flush()
-
-    async def _flush(self):
-        """Flush buffer to database"""
-        if not self.buffer:
-            return
+        """Hand payment over to the background flusher"""
+        self.arrivals += 1
+        await self.queue.put(payment)
+
+    def _target_batch_size(self, now: float) -> int:
+        """Size the next batch from an EWMA of ingress rate, or max out under backlog"""
+        elapsed = now - self.rate_mark
+        if elapsed > 0:
+            sample = self.arrivals / elapsed
+            self.ingress_rate += self.rate_smoothing * (sample - self.ingress_rate)
+            self.arrivals = 0
+            self.rate_mark = now
+
+        if self.queue.qsize() >= self.queue.maxsize // 2:
+            return self.max_batch_size
+
+        target = int(self.ingress_rate * self.target_latency)
+        return min(max(target, self.min_batch_size), self.max_batch_size)
+
+    async def run_forever(self):
+        """Save batches once they reach the adaptive target or the oldest payment hits flush_interval"""
+        loop = asyncio.get_running_loop()
+        self.rate_mark = loop.time()
+        while True:
+            batch: List[ProcessedPayment] = []
+            try:
+                batch.append(await self.queue.get())
+                # The deadline is stamped when the first payment of the batch is taken
+                deadline = loop.time() + self.flush_interval
+                target = self._target_batch_size(loop.time())
+                while len(batch) < target:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
 
-        payments_to_save = self.buffer.copy()
-        self.buffer.clear()
-        self.last_flush = datetime.now(timezone.utc)
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._save(batch)
+            except asyncio.CancelledError:
+                # Inserts are idempotent, so anything in hand goes back for force_flush
+                self._requeue(batch)
+                raise
+
+    def _drain(self) -> List[ProcessedPayment]:
+        """Take everything currently queued without waiting"""
+        payments = []
+        while True:
+            try:
+                payments.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return payments
+
+    def _requeue(self, payments: List[ProcessedPayment]):
+        for payment in payments:
+            try:
+                self.queue.put_nowait(payment)
+            except asyncio.QueueFull:
+                logger.error(f"Buffer full, dropping payment {payment.correlationId}")
+
+    async def _save(self, payments_to_save: List[ProcessedPayment]):
+        """Write a batch to database, re-queueing it on failure"""
+        if not payments_to_save:
+            return
 
-        loop = asyncio.get_event_loop()
         try:
-            await loop.run_in_executor(
-                None,
-                self.repo.save_batch,
-                payments_to_save
-            )
-            logging.info(f"Flushed {len(payments_to_save)} payments to database")
+            await self.repo.save_batch(payments_to_save)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Flushed %d payments to database", len(payments_to_save))
         except Exception as e:
-            logging.error(f"Error flushing payments: {e}")
-            async with self.lock:
-                self.buffer.extend(payments_to_save)
+            logger.error(f"Error flushing payments: {e}")
+            self._requeue(payments_to_save)
 
     async def force_flush(self):
         """Force flush all buffered payments"""
-        async with self.lock:
-            await self._flush()
+        await self._save(self._drain())
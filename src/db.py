@@ -1,49 +1,54 @@
 import os
-from sqlalchemy import Column, DateTime, Float, String, create_engine, MetaData, UUID
+from sqlalchemy import Column, DateTime, Float, String, MetaData, UUID, Index
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL", 
-    "postgresql://pyrinha:pyrinha@db:5432/pyrinha"
+    "postgresql+asyncpg://pyrinha:pyrinha@db:5432/pyrinha"
 )
 
-engine = create_engine(
+# Postgres runs with max_connections=20 shared by both API instances, so each
+# gets a fixed pool that fits; overflow connections would only be refused
+async_engine = create_async_engine(
     DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "8")),
+    max_overflow=0,
     pool_pre_ping=True,
     echo=False
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
 metadata = MetaData()
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+async def create_tables():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
-@contextmanager
-def get_db_session():
-    db = SessionLocal()
-    try:    
-        yield db
-        db.commit()
+@asynccontextmanager
+async def get_async_session():
+    session: AsyncSession = AsyncSessionLocal()
+    try:
+        yield session
+        await session.commit()
     except Exception:
-        db.rollback()
+        await session.rollback()
         raise
     finally:
-        db.close()
+        await session.close()
+
+@asynccontextmanager
+async def get_raw_connection():
+    """Pooled asyncpg connection for driver-level calls such as COPY"""
+    async with async_engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        yield raw.driver_connection
 
 
 class Payment(Base):
@@ -52,4 +57,15 @@ class Payment(Base):
     correlationId = Column("correlationId", UUID, index=True, primary_key=True)
     processor = Column(String)
     amount = Column(Float)
-    requestedAt = Column("requestedAt", DateTime)
\ No newline at end of file
+    requestedAt = Column("requestedAt", DateTime(timezone=True))
+
+    __table_args__ = (
+        Index(
+            "ix_payments_processor_requested_at",
+            "processor",
+            "requestedAt",
+            postgresql_include=["amount"],
+        ),
+        # Rows can be replayed from the processors, so skip WAL for this table
+        {"prefixes": ["UNLOGGED"]},
+    )
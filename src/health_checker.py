@@ -1,59 +1,114 @@
 import asyncio
-import json
+import logging
 import time
 from typing import Dict
 
 import httpx
+import orjson
 
-from src.worker import Cache
+from src.worker import PROCESSOR_URLS, Cache
+
+logger = logging.getLogger(__name__)
+
+# Probes get their own tiny pool so they never queue behind payment posts
+# when the processor pools are saturated, which would read as a failing processor
+HEALTH_HTTPX = httpx.AsyncClient(
+    http2=True,
+    timeout=2.0,
+    limits=httpx.Limits(max_connections=2, max_keepalive_connections=2),
+)
 
 
 class HealthChecker:
     def __init__(self, cache: Cache):
         self.cache = cache
-        self.last_check = {"default": 0, "fallback": 0}
+        self.last_check = {"default": float("-inf"), "fallback": float("-inf")}
         self.health_data = {
             "default": {"failing": True, "minResponseTime": float("inf")},
             "fallback": {"failing": True, "minResponseTime": float("inf")}
         }
         self.check_interval = 5  # seconds
+        self.ready = asyncio.Event()  # set once a probe has filled health_data
 
     async def get_health_status(self, processor_type: str) -> Dict:
         """Get cached health status, check if stale"""
-        now = time.time()
+        now = time.monotonic()
         if now - self.last_check[processor_type] > self.check_interval:
             asyncio.create_task(self._check_health_async(processor_type))
 
         return self.health_data[processor_type]
 
-    async def _check_health_async(self, processor_type: str):
-        """Async health check that updates cache"""
-        if processor_type == "default":
-            url = "http://payment-processor-default:8080/payments/service-health"
-        else:
-            url = "http://payment-processor-fallback:8080/payments/service-health"
+    async def _check_health_async(self, processor_type: str) -> bool:
+        """Probe a processor and publish the result, False if it was rate limited"""
+        if not await self._probe(processor_type):
+            return False
+
+        await self.cache.set(f"health_{processor_type}",
+                             orjson.dumps(self.health_data[processor_type]))
+        return True
+
+    async def _probe(self, processor_type: str) -> bool:
+        """Update health_data from the health endpoint, False if it was rate limited"""
+        url = f"{PROCESSOR_URLS[processor_type]}/payments/service-health"
 
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    self.health_data[processor_type] = response.json()
-                else:
-                    self.health_data[processor_type] = {
-                        "failing": True,
-                        "minResponseTime": float("inf")
-                    }
+            response = await HEALTH_HTTPX.get(url)
+            if response.status_code == 429:
+                # Another instance probed within the window, keep what we know
+                return False
+            if response.status_code == 200:
+                self.health_data[processor_type] = orjson.loads(response.content)
+            else:
+                self.health_data[processor_type] = {
+                    "failing": True,
+                    "minResponseTime": float("inf")
+                }
         except Exception:
             self.health_data[processor_type] = {
                 "failing": True,
                 "minResponseTime": float("inf")
             }
 
-        self.last_check[processor_type] = time.time()
+        self.last_check[processor_type] = time.monotonic()
+        self.ready.set()
+        return True
+
+    def _adopt_shared_health(self, processor_types, values):
+        """Take health published by other instances"""
+        for processor_type, value in zip(processor_types, values):
+            if value is not None:
+                health = orjson.loads(value)
+                # orjson writes the inf of a failing processor as null
+                if health["minResponseTime"] is None:
+                    health["minResponseTime"] = float("inf")
+                self.health_data[processor_type] = health
+                self.last_check[processor_type] = time.monotonic()
+                self.ready.set()
+
+    async def check_all(self):
+        """Probe both processors concurrently, then publish ours and fetch shared results in one round trip"""
+        try:
+            processor_types = ("default", "fallback")
+            probed = await asyncio.gather(*(self._probe(p) for p in processor_types))
+            fresh = {
+                f"health_{p}": orjson.dumps(self.health_data[p])
+                for p, ok in zip(processor_types, probed) if ok
+            }
+            rate_limited = [p for p, ok in zip(processor_types, probed) if not ok]
+            values = await self.cache.mset_mget(fresh, [f"health_{p}" for p in rate_limited])
+            self._adopt_shared_health(rate_limited, values)
+        except Exception as e:
+            logger.error(f"Health check error: {e}")
 
-        # Update Redis cache
-        self.cache.set(f"health_{processor_type}",
-                       json.dumps(self.health_data[processor_type]))
+    async def run_forever(self):
+        """Re-probe every check_interval on a fixed, drift-free cadence"""
+        # lifespan already ran the first probe, so start one interval later
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time()
+        while True:
+            next_deadline += self.check_interval
+            await asyncio.sleep(max(0.0, next_deadline - loop.time()))
+            await self.check_all()
 
     def choose_best_processor(self) -> str:
         """Choose the best processor based on health status"""
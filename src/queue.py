@@ -1,63 +1,112 @@
 import asyncio
+import itertools
 import logging
+import random
+from collections import OrderedDict
 
+logger = logging.getLogger(__name__)
 
 class GlobalPaymentQueue:
-    def __init__(self):
-        self.queue = asyncio.Queue(maxsize=10000)
+    def __init__(
+        self,
+        workers: int = 8,
+        queue_size: int = 1024,
+        batch_size: int = 16,
+        max_tracked_retries: int = 16384,
+    ):
+        if workers & (workers - 1):
+            raise ValueError("workers must be a power of two")
+        # One queue per worker, fed round-robin, so workers never contend on get()
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.mask = workers - 1
+        self.next_queue = 0
+        self.batch_size = batch_size
         self.processing = False
-        self.failed_payments = asyncio.Queue(maxsize=1000)
-        self.retry_count = {}
+        # (wake_at, seq, payment): due retries come out first, seq breaks ties
+        self.failed_payments = asyncio.PriorityQueue(maxsize=1000)
+        self.retry_seq = itertools.count()
+        self.max_retries = 3
+        self.retry_base_delay = 0.5
+        self.retry_max_delay = 30.0
+        self.retry_count: OrderedDict[str, int] = OrderedDict()
+        self.max_tracked_retries = max_tracked_retries
 
     async def add_payment(self, payment: dict):
+        queue = self.queues[self.next_queue & self.mask]
+        self.next_queue += 1
         try:
-            self.queue.put_nowait(payment)
+            queue.put_nowait(payment)
         except asyncio.QueueFull:
-            logging.warning(f"Queue full, dropping payment {payment.get('correlationId')}")
+            logger.warning(f"Queue full, dropping payment {payment.get('correlationId')}")
 
     async def start_processing(self, processor):
         if self.processing:
             return
         self.processing = True
 
-        workers = [
-            asyncio.create_task(self._worker(processor, i))
-            for i in range(10)
-        ]
+        async with asyncio.TaskGroup() as tg:
+            for i in range(len(self.queues)):
+                tg.create_task(self._worker(processor, i))
 
-        retry_worker = asyncio.create_task(self._retry_worker(processor))
-
-        await asyncio.gather(*workers, retry_worker)
+            tg.create_task(self._retry_worker())
 
     async def _worker(self, processor, worker_id: int):
+        queue = self.queues[worker_id]
         while True:
-            try:
-                payment = await asyncio.wait_for(
-                    self.queue.get(), timeout=1.0
-                )
-                await processor.process_single_payment(payment)
-                self.queue.task_done()
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                logging.error(f"Worker {worker_id} error: {e}")
-                correlation_id = payment.get('correlationId', 'unknown')
-                if self.retry_count.get(correlation_id, 0) < 3:
-                    await self.failed_payments.put(payment)
-                    self.retry_count[correlation_id] = self.retry_count.get(correlation_id, 0) + 1
-
-    async def _retry_worker(self, processor):
+            # Cancellation is the only way out, so block without a polling timeout
+            batch = [await queue.get()]
+            for _ in range(self.batch_size - 1):
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            results = await asyncio.gather(
+                *(processor.process_single_payment(p) for p in batch),
+                return_exceptions=True,
+            )
+
+            for payment, result in zip(batch, results):
+                queue.task_done()
+                if isinstance(result, Exception):
+                    logger.error(f"Worker {worker_id} error: {result}")
+                    self._schedule_retry(payment)
+                elif not result:
+                    self._schedule_retry(payment)
+
+    def _schedule_retry(self, payment: dict):
+        """Queue payment for another attempt after an exponential, jittered delay"""
+        correlation_id = payment.get('correlationId', 'unknown')
+        attempts = self.retry_count.get(correlation_id, 0)
+        if attempts >= self.max_retries:
+            return
+
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempts)
+        wake_at = asyncio.get_running_loop().time() + delay * (0.5 + random.random())
+        try:
+            self.failed_payments.put_nowait((wake_at, next(self.retry_seq), payment))
+        except asyncio.QueueFull:
+            logger.warning(f"Retry queue full, dropping payment {correlation_id}")
+            return
+
+        self.retry_count[correlation_id] = attempts + 1
+        self.retry_count.move_to_end(correlation_id)
+        while len(self.retry_count) > self.max_tracked_retries:
+            self.retry_count.popitem(last=False)
+
+    async def _retry_worker(self):
+        """Feed retries back into the worker queues once their delay has elapsed"""
+        loop = asyncio.get_running_loop()
         while True:
-            try:
-                payment = await asyncio.wait_for(
-                    self.failed_payments.get(), timeout=1.0
-                )
-                await asyncio.sleep(0.1)
-                await processor.process_single_payment(payment)
-            except asyncio.TimeoutError:
+            wake_at, seq, payment = await self.failed_payments.get()
+            delay = wake_at - loop.time()
+            if delay > 0:
+                # Put it back and re-check shortly, so sooner retries are not held up
+                self.failed_payments.put_nowait((wake_at, seq, payment))
+                await asyncio.sleep(min(delay, 0.1))
                 continue
-            except Exception as e:
-                logging.error(f"Retry worker error: {e}")
+
+            await self.add_payment(payment)
 
 
 payment_queue: GlobalPaymentQueue = GlobalPaymentQueue()
\ No newline at end of file
@@ -1,37 +1,29 @@
 from datetime import datetime, timezone
+from typing import NamedTuple
 from zoneinfo import ZoneInfo
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class Payment(BaseModel):
     correlationId: UUID
     amount: float
-    requestedAt: datetime = datetime.now(tz=timezone.utc)
+    requestedAt: datetime = Field(default_factory=lambda: datetime.now(tz=timezone.utc))
 
     def to_dict(self) -> dict:
+        # requestedAt stays a datetime; orjson writes it as ISO 8601 on the way out
         return {
             "correlationId": str(self.correlationId),
             "amount": self.amount,
-            "requestedAt": self.requestedAt.isoformat()
+            "requestedAt": self.requestedAt
         }
 
-class ProcessedPayment(BaseModel):
-    correlationId: UUID
+# Fields follow payments column order, so a batch can go straight to asyncpg
+class ProcessedPayment(NamedTuple):
+    correlationId: str
     processor: str
     amount: float
     requestedAt: datetime
 
-    def to_dict(self) ->  dict:
-        return {
-            "correlationId": str(self.correlationId),
-            "processor": self.processor,
-            "amount": self.amount,
-            "requestedAt": self.requestedAt.isoformat()
-        }
-
-    class Config:
-        from_attributes = True
-
 class PaymentSummary(BaseModel):
     totalRequests: int
     totalAmount: float
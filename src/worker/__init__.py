@@ -0,0 +1,16 @@
+from src.worker.api import PaymentApi
+from src.worker.cache import Cache
+from src.worker.clients import JSON_HEADERS, PROCESSOR_CLIENTS, PROCESSOR_URLS
+from src.worker.processor import PaymentProcessor
+from src.worker.repo import COPY_THRESHOLD, PaymentRepo
+
+__all__ = [
+    "COPY_THRESHOLD",
+    "JSON_HEADERS",
+    "PROCESSOR_CLIENTS",
+    "PROCESSOR_URLS",
+    "Cache",
+    "PaymentApi",
+    "PaymentProcessor",
+    "PaymentRepo",
+]
@@ -0,0 +1,24 @@
+import orjson
+
+from src.worker.cache import Cache
+from src.worker.clients import JSON_HEADERS, PROCESSOR_CLIENTS
+
+
+class PaymentApi:
+    def __init__(self, cache: Cache):
+        self.cache = cache
+        self.clients = PROCESSOR_CLIENTS
+
+    async def send_payment_default(self, payment: dict) -> int:
+        response = await self.clients["default"].post(
+            "/payments", content=orjson.dumps(payment), headers=JSON_HEADERS
+        )
+
+        return response.status_code
+
+    async def send_payment_fallback(self, payment: dict) -> int:
+        response = await self.clients["fallback"].post(
+            "/payments", content=orjson.dumps(payment), headers=JSON_HEADERS
+        )
+
+        return response.status_code
@@ -0,0 +1,28 @@
+from typing import Dict, List
+
+import redis.asyncio as redis
+
+
+class Cache:
+    def __init__(self):
+        # Values are orjson blobs, so skip response decoding and let hiredis parse raw bytes
+        pool = redis.ConnectionPool(host="cache", port=6379, max_connections=32)
+        self.client = redis.Redis(connection_pool=pool)
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str | bytes):
+        return await self.client.set(key, value)
+
+    async def mset_mget(self, values: Dict[str, bytes], keys: List[str]) -> List:
+        """Write values and read keys in one round trip"""
+        if not values and not keys:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            if values:
+                pipe.mset(values)
+            if keys:
+                pipe.mget(keys)
+            results = await pipe.execute()
+        return results[-1] if keys else []
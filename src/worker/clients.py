@@ -0,0 +1,32 @@
+import os
+
+import httpx
+
+PROCESSOR_URLS = {
+    "default": os.getenv("DEFAULT_PAYMENT_PROCESSOR", "http://payment-processor-default:8080"),
+    "fallback": os.getenv("FALLBACK_PAYMENT_PROCESSOR", "http://payment-processor-fallback:8080"),
+}
+
+def _processor_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=True,
+        # A read timeout is not a refusal: the processor may still book the payment,
+        # and a re-send is then rejected as a duplicate and never recorded. Keep
+        # the original 10 s budget so only truly stuck requests time out.
+        timeout=httpx.Timeout(connect=1.0, read=10.0, write=5.0, pool=None),
+        limits=httpx.Limits(
+            max_connections=100, max_keepalive_connections=100, keepalive_expiry=60.0
+        ),
+    )
+
+# Bodies are serialized with orjson up front and posted as raw content
+JSON_HEADERS = {"content-type": "application/json"}
+
+# One keep-alive pool per upstream, so a slow processor cannot hold the
+# connections the other one needs. Everything that talks to a processor
+# borrows from here and main's lifespan closes them.
+PROCESSOR_CLIENTS = {
+    processor_type: _processor_client(url)
+    for processor_type, url in PROCESSOR_URLS.items()
+}
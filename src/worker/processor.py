@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from collections import Counter
+
+import orjson
+
+from src.buffer import PaymentBuffer
+from src.schemas import ProcessedPayment
+from src.worker.clients import JSON_HEADERS, PROCESSOR_CLIENTS
+from src.worker.repo import PaymentRepo
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentProcessor:
+    def __init__(self, health_manager, repo: PaymentRepo):
+        self.health_manager = health_manager
+        self.payment_buffer = PaymentBuffer(repo, flush_interval=1.0)
+        self.repo = repo
+        self.clients = PROCESSOR_CLIENTS
+        # Per-payment outcomes are counted here and logged in aggregate by report_stats
+        self.counters: Counter[str] = Counter()
+
+    async def process_single_payment(self, payment: dict) -> bool:
+        """Send to the preferred processor, failing over only once it has refused"""
+
+        if not self.health_manager.ready.is_set():
+            try:
+                await asyncio.wait_for(self.health_manager.ready.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+        # Health data already weighs minResponseTime, so the slow side is avoided
+        # up front. Never post to both at once: each processor charges separately.
+        processor_type = self.health_manager.choose_best_processor()
+        body = orjson.dumps(payment)
+
+        if await self._send_payment(body, processor_type):
+            await self._buffer_payment(payment, processor_type)
+            return True
+
+        alternative = "fallback" if processor_type == "default" else "default"
+        if await self._send_payment(body, alternative):
+            await self._buffer_payment(payment, alternative)
+            return True
+
+        return False
+
+    async def _buffer_payment(self, payment: dict, processor_type: str):
+        await self.payment_buffer.add_payment(ProcessedPayment(
+            payment["correlationId"],
+            processor_type,
+            payment["amount"],
+            payment["requestedAt"],
+        ))
+
+    async def _send_payment(self, body: bytes, processor_type: str) -> bool:
+        """Send a serialized payment to specific processor"""
+        try:
+            response = await self.clients[processor_type].post(
+                "/payments", content=body, headers=JSON_HEADERS
+            )
+        except Exception as e:
+            self.counters[f"{processor_type}_error"] += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Error sending to %s: %r", processor_type, e)
+            return False
+
+        if response.status_code == 200:
+            self.counters[f"{processor_type}_ok"] += 1
+            return True
+        self.counters[f"{processor_type}_rejected"] += 1
+        return False
+
+    async def report_stats(self, interval: float = 10.0):
+        """Log and reset send outcome counters every interval"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.counters:
+                logger.info("Payment sends in last %.0fs: %s", interval, dict(self.counters))
+                self.counters.clear()
+
+    async def shutdown(self):
+        """Ensure all buffered payments are saved before shutdown"""
+        await self.payment_buffer.force_flush()
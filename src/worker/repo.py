@@ -0,0 +1,197 @@
+import asyncio
+import itertools
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import asyncpg
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.db import get_async_session, get_raw_connection
+from src.schemas import ProcessedPayment
+
+logger = logging.getLogger(__name__)
+
+# Built once so SQLAlchemy's compiled cache and asyncpg's per-connection
+# prepared statement cache are hit on every summary request
+SUMMARY_SQL = text(
+    """
+    SELECT processor, COUNT(*), COALESCE(SUM(amount), 0)
+    FROM payments
+    WHERE "requestedAt" BETWEEN :from_date AND :to_date
+    GROUP BY processor
+    """
+)
+
+PAYMENT_COLUMNS = ["correlationId", "processor", "amount", "requestedAt"]
+
+SELECT_ALL_SQL = 'SELECT "correlationId", processor, amount, "requestedAt" FROM payments'
+
+# One statement text for every batch size: the batch travels as four arrays,
+# so asyncpg prepares it once per connection and Postgres reuses the plan
+INSERT_UNNEST_SQL = """
+    INSERT INTO payments ("correlationId", processor, amount, "requestedAt")
+    SELECT * FROM unnest($1::uuid[], $2::text[], $3::float8[], $4::timestamptz[])
+    ON CONFLICT ("correlationId") DO NOTHING
+"""
+
+# Above this size (e.g. the shutdown drain) COPY beats the array round trip
+COPY_THRESHOLD = 1000
+
+# Failures worth another attempt on the same batch. Pool checkout surfaces
+# refused connections as a bare OSError and asyncpg raises its own classes,
+# so SQLAlchemy's OperationalError alone never matched them.
+TRANSIENT_DB_ERRORS = (
+    OperationalError,
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.InsufficientResourcesError,
+)
+
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS payments_stage
+    (LIKE payments INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+
+INSERT_FROM_STAGE_SQL = """
+    INSERT INTO payments ("correlationId", processor, amount, "requestedAt")
+    SELECT "correlationId", processor, amount, "requestedAt" FROM payments_stage
+    ON CONFLICT ("correlationId") DO NOTHING
+"""
+
+class PaymentRepo:
+    def __init__(self):
+        self.retry_delay = 0.1
+        self.max_retries = 3
+        self.fallback_chunk_size = 10
+        # TRUNCATE needs table ownership; set PURGE_TRUNCATE=0 to fall back to DELETE
+        self.truncate_on_purge = os.getenv("PURGE_TRUNCATE", "1") != "0"
+
+    async def save_batch(self, payments: List[ProcessedPayment]):
+        """Ultra-reliable batch insert with comprehensive error handling"""
+        if not payments:
+            return
+
+        if await self._try_batch_insert(payments):
+            return
+
+        logger.warning(
+            f"Batch insert failed, trying individual inserts for {len(payments)} payments"
+        )
+        await self._fallback_individual_inserts(payments)
+
+    async def _try_batch_insert(self, payments: List[ProcessedPayment]) -> bool:
+        """Attempt batch insert with retries"""
+        use_copy = len(payments) >= COPY_THRESHOLD
+        # Column arrays are built once and reused by every attempt
+        columns = () if use_copy else tuple(zip(*payments))
+        for attempt in range(self.max_retries):
+            try:
+                async with get_raw_connection() as conn:
+                    if use_copy:
+                        await self._copy_insert(conn, payments)
+                    else:
+                        await conn.execute(INSERT_UNNEST_SQL, *columns)
+                    return True
+
+            except TRANSIENT_DB_ERRORS as e:
+                logger.warning(f"Batch insert attempt {attempt + 1} failed: {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay * (attempt + 1))
+                continue
+            except Exception as e:
+                logger.error(f"Unexpected error in batch insert: {e}")
+                await self._fallback_individual_inserts(payments)
+                return True
+        logger.info(f"Enviou mas não salvou: {len(payments)}")
+        return False
+
+    @staticmethod
+    async def _copy_insert(conn: asyncpg.Connection, payments: List[ProcessedPayment]):
+        """COPY into a per-connection staging table, then merge into payments"""
+        async with conn.transaction():
+            await conn.execute(CREATE_STAGE_SQL)
+            await conn.copy_records_to_table(
+                "payments_stage", records=payments, columns=PAYMENT_COLUMNS
+            )
+            await conn.execute(INSERT_FROM_STAGE_SQL)
+
+    async def _fallback_individual_inserts(self, payments: List[ProcessedPayment]):
+        """Fallback to chunked inserts in one transaction, isolating bad rows"""
+        failed_payments = []
+
+        try:
+            async with get_raw_connection() as conn, conn.transaction():
+                for chunk in itertools.batched(payments, self.fallback_chunk_size):
+                    try:
+                        async with conn.transaction():  # savepoint
+                            await conn.execute(INSERT_UNNEST_SQL, *zip(*chunk))
+                        continue
+                    except (asyncpg.PostgresError, asyncpg.DataError) as e:
+                        logger.warning(f"Chunk insert failed, retrying row by row: {e}")
+
+                    for payment in chunk:
+                        try:
+                            async with conn.transaction():
+                                await conn.execute(INSERT_UNNEST_SQL, *zip(payment))
+                        except (asyncpg.PostgresError, asyncpg.DataError) as e:
+                            logger.error(
+                                f"Failed to save individual payment {payment.correlationId}: {e}"
+                            )
+                            failed_payments.append(payment)
+        except Exception as e:
+            logger.error(f"Fallback insert transaction failed: {e}")
+            failed_payments = payments
+
+        if failed_payments:
+            logger.critical(
+                f"Permanently failed to save {len(failed_payments)} payments"
+            )
+
+    async def get_all(self):
+        """Get all payments with error handling"""
+        try:
+            async with get_raw_connection() as conn:
+                rows = await conn.fetch(SELECT_ALL_SQL)
+            return [
+                ProcessedPayment(str(correlation_id), processor, amount, requested_at)
+                for correlation_id, processor, amount, requested_at in rows
+            ]
+        except Exception as e:
+            logger.error(f"Failed to retrieve payments: {e}")
+            return []
+
+    async def summarize(
+        self, from_date: datetime, to_date: datetime
+    ) -> Dict[str, Tuple[int, float]]:
+        """Aggregate count and amount per processor inside the database"""
+        try:
+            async with get_async_session() as session:
+                rows = await session.execute(
+                    SUMMARY_SQL, {"from_date": from_date, "to_date": to_date}
+                )
+                return {
+                    processor: (count, total) for processor, count, total in rows
+                }
+        except Exception as e:
+            logger.error(f"Failed to summarize payments: {e}")
+            return {}
+
+    async def purge(self):
+        """Purge all payments with verification"""
+        try:
+            async with get_async_session() as session:
+                if self.truncate_on_purge:
+                    await session.execute(text("TRUNCATE TABLE payments"))
+                else:
+                    await session.execute(text("DELETE FROM payments"))
+                logger.info("Purged payments")
+                return True
+        except Exception as e:
+            logger.error(f"Failed to purge payments: {e}")
+            return False